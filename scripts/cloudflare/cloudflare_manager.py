@@ -9,22 +9,210 @@ Cloudflare DNS 管理模块
 
 import json
 import os
+import socket
 import sys
 import time
 import argparse
+import copy
+import hashlib
 import requests
-from typing import Dict, List, Any, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import islice
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
 
-# 添加项目根目录到 Python 路径
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+# 项目根目录与默认配置文件路径，在导入时计算一次
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+_DEFAULT_CONFIG = os.path.join(_PROJECT_ROOT, 'config', 'domains.json')
 
-from scripts.utils.common import load_json_file
+# 作为脚本直接运行时添加项目根目录到 Python 路径 (作为模块导入时已可访问 scripts 包)
+if __name__ == "__main__":
+    sys.path.insert(0, _PROJECT_ROOT)
+
+from scripts.utils.common import load_json_file, save_json_file, json_loads, json_dumps
+
+
+# 记录未指定 TTL 时使用的默认值
+DEFAULT_TTL = 3600
+
+# 支持 Cloudflare 代理的记录类型
+PROXIED_RECORD_TYPES = ('A', 'AAAA', 'CNAME')
+
+# 支持的 HTTP 方法，以及需要携带请求体的方法
+_SUPPORTED_METHODS = frozenset({'GET', 'POST', 'PUT', 'DELETE'})
+_BODY_METHODS = frozenset({'POST', 'PUT'})
+
+# 读取超时、服务端错误时允许自动重试的幂等方法；POST (创建记录、批量提交) 重试可能造成重复记录，
+# 只在限流 (见 _RateLimitRetry) 时重试
+_RETRY_METHODS = frozenset({'GET', 'PUT', 'DELETE'})
+
+# Token 验证结果的本地缓存目录，多次调用命令行时避免重复验证
+_TOKEN_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'libredomains')
+
+# 调试输出中需要隐藏的认证请求头
+_SECRET_HEADERS = ('Authorization', 'X-Auth-Key')
+
+# API 请求失败时的错误说明模板
+_ERR_400 = ("DNS 记录查询失败 (400 错误):\n"
+            "可能原因:\n"
+            "1. API Token 缺少 Zone:Read 权限\n"
+            "2. Zone ID 不正确或无权访问\n"
+            "3. API Token 已过期或被撤销\n"
+            "4. 查询参数格式错误\n"
+            "调试信息: {debug_info}\n"
+            "原始错误: {error}")
+_ERR_401 = ("API Token 认证失败 (401 错误):\n"
+            "请检查:\n"
+            "1. API Token 是否正确\n"
+            "2. Token 是否已过期\n"
+            "3. Token 权限是否足够\n"
+            "原始错误: {error}")
+_ERR_403 = ("API Token 权限不足 (403 错误):\n"
+            "请确保 API Token 具有以下权限:\n"
+            "1. Zone:Read\n"
+            "2. DNS:Edit\n"
+            "3. 对应 Zone 的访问权限\n"
+            "原始错误: {error}")
+_ERR_REQUEST = "请求失败: {error}"
+_STATUS_ERRORS = {401: _ERR_401, 403: _ERR_403}
+
+
+@lru_cache(maxsize=8)
+def _load_config_cached(config_path: str, mtime: float) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """按路径和修改时间缓存配置文件的解析结果，文件变更后自动失效"""
+    return load_json_file(config_path)
+
+
+def _record_fingerprint(record: Dict[str, Any]) -> Tuple:
+    """
+    生成 DNS 记录的比较指纹，只包含 Cloudflare 实际保存的字段
+    
+    Args:
+        record: DNS 记录 (name 为完整域名)
+    
+    Returns:
+        可直接比较的元组
+    """
+    record_type = record.get('type')
+    proxied = record.get('proxied', True) if record_type in PROXIED_RECORD_TYPES else None
+    # 代理记录的 TTL 固定为自动 (Cloudflare 返回 1)，配置中的 TTL 不参与比较
+    ttl = 1 if proxied else record.get('ttl', DEFAULT_TTL)
+    return (
+        record_type,
+        record.get('name', '').lower(),
+        record.get('content'),
+        ttl,
+        proxied,
+        record.get('priority') if record_type == 'MX' else None,
+    )
+
+
+def _format_api_errors(errors: List[Any]) -> str:
+    """
+    格式化 Cloudflare 响应中的 errors 列表
+    
+    Args:
+        errors: 响应中的 errors 字段
+    
+    Returns:
+        以分号分隔的错误说明
+    """
+    error_details = []
+    for err in errors:
+        if isinstance(err, dict):
+            error_details.append(f"Code: {err.get('code', 'N/A')}, Message: {err.get('message', str(err))}")
+        else:
+            error_details.append(str(err))
+    return '; '.join(error_details)
+
+
+def _error_detail(response) -> str:
+    """
+    提取错误响应的说明，优先使用 Cloudflare 返回的 errors，无法解析时退回截断的响应文本
+    
+    Args:
+        response: 错误状态码的响应
+    
+    Returns:
+        错误说明
+    """
+    try:
+        errors = json_loads(response.content).get('errors')
+    except (ValueError, AttributeError):
+        errors = None
+    if errors and isinstance(errors, list):
+        return _format_api_errors(errors)
+    return response.text[:512]
+
+
+# 在 urllib3 默认选项 (TCP_NODELAY) 基础上启用 TCP keepalive，
+# 使连接池中的空闲连接在同步间隙内保持可用
+_SOCKET_OPTIONS = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+if hasattr(socket, 'TCP_KEEPIDLE'):
+    _SOCKET_OPTIONS.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60))
+# 已发送数据 20 秒未被确认即判定连接失效 (仅 Linux)，避免卡死在失效连接上
+if hasattr(socket, 'TCP_USER_TIMEOUT'):
+    _SOCKET_OPTIONS.append((socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, 20000))
+
+
+class _KeepAliveAdapter(HTTPAdapter):
+    """为连接池设置自定义 socket 选项的 HTTPAdapter"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs.setdefault('socket_options', _SOCKET_OPTIONS)
+        super().init_poolmanager(*args, **kwargs)
+
+
+class _RateLimitRetry(Retry):
+    """
+    限流 (429) 及带 Retry-After 头的响应表示请求未被执行，任何方法都可以安全重试；
+    其余情况仍只重试 allowed_methods 中的幂等方法
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if status_code == 429 or (has_retry_after and status_code in self.RETRY_AFTER_STATUS_CODES):
+            return bool(self.total and self.respect_retry_after_header)
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class CloudflareAPIError(Exception):
+    """
+    Cloudflare API 请求错误
+    
+    错误字段作为属性保存，完整的错误说明在转换为字符串时才生成
+    """
+
+    def __init__(self, template: str, original: str, status: int = None,
+                 params: Dict[str, Any] = None, debug_info: Dict[str, Any] = None):
+        super().__init__(original)
+        self.template = template
+        self.original = original
+        self.status = status
+        self.params = params
+        self.debug_info = debug_info
+
+    def __str__(self) -> str:
+        return self.template.format(debug_info=self.debug_info, error=self.original)
+
+    @property
+    def rejected(self) -> bool:
+        """
+        Cloudflare 是否明确拒绝了请求 (请求未被执行)
+        
+        429 之外的 4xx 错误，或成功状态码但响应中 success 为 false 时成立；
+        连接失败、超时、5xx 及无法解析的响应无法确定请求是否已执行，不在其中
+        """
+        return self.status is not None and self.status != 429 and self.status < 500
 
 
 class CloudflareManager:
     """Cloudflare API 管理类"""
 
-    def __init__(self, api_key: str, email: str = None, config_path: str = None):
+    def __init__(self, api_key: str, email: str = None, config_path: str = None, validate: bool = False):
         """
         初始化 Cloudflare 管理器
         
@@ -32,11 +220,15 @@ class CloudflareManager:
             api_key: Cloudflare API 密钥或 API Token
             email: Cloudflare 账户邮箱 (使用 API Key 时需要)
             config_path: 配置文件路径 (可选，默认为项目根目录下的 config/domains.json)
+            validate: 是否在初始化时验证 API Token (额外一次请求，默认关闭)
         """
         self.api_key = api_key
         self.email = email
         self.base_url = "https://api.cloudflare.com/client/v4/"
         
+        # 按 zone_id 缓存 Zone 相关接口的 URL 前缀
+        self._zone_urls: Dict[str, str] = {}
+        
         # 确定是使用 API Key 还是 API Token
         self.is_token = not email
         
@@ -51,38 +243,96 @@ class CloudflareManager:
             self.headers['X-Auth-Email'] = email
             self.headers['X-Auth-Key'] = api_key
         
+        # 调试输出使用的脱敏请求头，只需计算一次
+        self._redacted_headers = {k: '***' if k in _SECRET_HEADERS else v for k, v in self.headers.items()}
+        
         # 加载配置
         self.config = self._load_config(config_path)
         
         # 初始化域名 zone ID 映射
-        self.zone_ids = {}
-        for domain_config in self.config.get('domains', []):
-            domain_name = domain_config.get('name')
-            zone_id = domain_config.get('cloudflare_zone_id')
-            if domain_name and zone_id:
-                self.zone_ids[domain_name] = zone_id
+        self.zone_ids = {
+            d['name']: d['cloudflare_zone_id']
+            for d in self.config.get('domains', [])
+            if d.get('name') and d.get('cloudflare_zone_id')
+        }
+        
+        # 设置请求超时 (连接超时, 读取超时)，连接阶段卡住时尽快失败
+        self.timeout = (
+            self.config.get('cloudflare_connect_timeout', 5),
+            self.config.get('cloudflare_read_timeout', self.config.get('cloudflare_timeout', 30))
+        )
+        
+        # Zone 信息缓存 {zone_id: (缓存时间, 验证信息)}，同一次同步中避免重复请求
+        self.cache_ttl = self.config.get('cloudflare_cache_ttl', 60)
+        self._zone_cache: Dict[str, Tuple[float, str]] = {}
+        # 确认 Token 权限范围无误时可完全跳过 Zone 访问验证
+        self.skip_zone_verify = self.config.get('cloudflare_skip_zone_verify', False)
+        
+        # Token 验证结果在本地缓存的有效期 (秒)，为 0 时不使用缓存
+        self.token_cache_ttl = self.config.get('cloudflare_token_cache_ttl', 3600)
         
-        # 设置请求超时
-        self.timeout = self.config.get('cloudflare_timeout', 30)
+        # 同步记录时的最大并发请求数
+        self.concurrency = self.config.get('cloudflare_concurrency', 8)
         
-        # 验证 API Token 权限
-        self._validate_token()
+        # 列出 DNS 记录时的单页大小
+        self.page_size = self.config.get('cloudflare_page_size', 5000)
+        
+        # 复用同一个 Session，保持与 Cloudflare API 的长连接
+        # 连接池大小不小于并发数，避免线程间争抢连接
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # 遇到限流 (429) 或服务端错误 (仅幂等请求) 时按指数退避重试，并遵循 Retry-After 头
+        retry = _RateLimitRetry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=_RETRY_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = _KeepAliveAdapter(pool_connections=1, pool_maxsize=max(16, self.concurrency), max_retries=retry)
+        self.session.mount('https://', adapter)
+        
+        # 验证 API Token 权限 (按需，Token 无效时后续请求同样会以 401 失败)
+        if validate:
+            self._validate_token()
+
+    def _token_cache_path(self) -> str:
+        """获取当前凭据对应的 Token 验证缓存文件路径 (文件名只包含凭据的哈希)"""
+        digest = hashlib.sha256(f"{self.email or ''}:{self.api_key}".encode('utf-8')).hexdigest()[:16]
+        return os.path.join(_TOKEN_CACHE_DIR, f"cf_{digest}.json")
 
-    def _validate_token(self):
-        """验证 API Token 的有效性和权限"""
+    def _validate_token(self, use_cache: bool = True):
+        """
+        验证 API Token 的有效性和权限，验证成功的结果在本地缓存一段时间
+        
+        Args:
+            use_cache: 是否使用缓存的验证结果 (诊断时应关闭，以免已撤销的 Token 被报告为有效)
+        """
+        cache_path = self._token_cache_path() if self.token_cache_ttl > 0 else None
+        if cache_path and use_cache:
+            cached, _ = load_json_file(cache_path)
+            # 缓存文件可能被截断或手动修改，结构不符时视为未命中
+            verified_until = cached.get('verified_until') if isinstance(cached, dict) else None
+            if (isinstance(verified_until, (int, float)) and not isinstance(verified_until, bool)
+                    and verified_until > time.time()):
+                print(f"API Token 状态: {cached.get('status', 'active')} (缓存的验证结果，本次未重新验证)", file=sys.stderr)
+                return
+        
         try:
             # 测试基本的 API 访问权限
-            response = requests.get(
-                f"{self.base_url}user/tokens/verify",
-                headers=self.headers,
-                timeout=self.timeout
-            )
+            response = self.session.get(f"{self.base_url}user/tokens/verify", timeout=self.timeout)
             
             if response.status_code == 200:
-                result = response.json()
+                result = json_loads(response.content)
                 if result.get('success', False):
                     token_info = result.get('result', {})
                     print(f"API Token 验证成功: {token_info.get('status', 'active')}", file=sys.stderr)
+                    if cache_path:
+                        save_json_file(cache_path, {
+                            'status': token_info.get('status', 'active'),
+                            'verified_until': time.time() + self.token_cache_ttl
+                        })
                 else:
                     raise Exception(f"Token 验证失败: {result.get('errors', [])}")
             else:
@@ -93,6 +343,16 @@ class CloudflareManager:
         except Exception as e:
             print(f"警告: Token 验证异常: {str(e)}", file=sys.stderr)
 
+    def close(self):
+        """关闭底层 HTTP 会话"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def _load_config(self, config_path: str = None) -> Dict[str, Any]:
         """
         加载配置文件
@@ -103,55 +363,89 @@ class CloudflareManager:
         Returns:
             配置信息字典
         """
-        if config_path is None:
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            config_path = os.path.join(current_dir, '..', '..', 'config', 'domains.json')
+        config_path = os.path.abspath(config_path) if config_path else _DEFAULT_CONFIG
+        try:
+            mtime = os.path.getmtime(config_path)
+        except OSError:
+            mtime = 0.0
         
-        config, error = load_json_file(config_path)
+        config, error = _load_config_cached(config_path, mtime)
         if error:
             raise Exception(f"加载配置文件失败: {error}")
         
-        return config
+        # 缓存的解析结果为各实例共享，返回副本，避免一个实例的修改影响其他实例
+        return copy.deepcopy(config)
+    
+    def _zone_url(self, zone_id: str, suffix: str = '') -> str:
+        """
+        获取 Zone 下接口的完整 URL
+        
+        Args:
+            zone_id: Zone ID
+            suffix: Zone 前缀之后的路径，如 'dns_records'
+        
+        Returns:
+            完整 URL
+        """
+        prefix = self._zone_urls.get(zone_id)
+        if prefix is None:
+            prefix = self._zone_urls[zone_id] = f"{self.base_url}zones/{zone_id}/"
+        return prefix + suffix
     
-    def _request(self, method: str, endpoint: str, data: dict = None, params: dict = None) -> Dict[str, Any]:
+    def _request(self, method: str, endpoint: str, data: dict = None, params: dict = None,
+                 listing: bool = False) -> Dict[str, Any]:
         """
         发送 API 请求
         
         Args:
             method: HTTP 方法
-            endpoint: API 端点
+            endpoint: API 端点 (相对 base_url 的路径，或 _zone_url 生成的完整 URL)
             data: 请求数据 (可选)
             params: URL 参数 (可选)
+            listing: 是否为 DNS 记录列表读取 (400 错误时附带 Token 权限提示)
         
         Returns:
             API 响应
         """
-        url = self.base_url + endpoint.lstrip('/')
+        url = endpoint if endpoint.startswith(self.base_url) else self.base_url + endpoint.lstrip('/')
         
-        try:
-            if method.upper() == 'GET':
-                response = requests.get(url, headers=self.headers, params=params, timeout=self.timeout)
-            elif method.upper() == 'POST':
-                response = requests.post(url, headers=self.headers, json=data, params=params, timeout=self.timeout)
-            elif method.upper() == 'PUT':
-                response = requests.put(url, headers=self.headers, json=data, params=params, timeout=self.timeout)
-            elif method.upper() == 'DELETE':
-                response = requests.delete(url, headers=self.headers, params=params, timeout=self.timeout)
-            else:
-                raise ValueError(f"不支持的 HTTP 方法: {method}")
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            if not result.get('success', False):
-                errors = result.get('errors', [])
-                error_msg = ', '.join([err.get('message', str(err)) for err in errors])
-                raise Exception(f"Cloudflare API 错误: {error_msg}")
-            
-            return result
+        method = method.upper()
+        if method not in _SUPPORTED_METHODS:
+            raise ValueError(f"不支持的 HTTP 方法: {method}")
         
+        try:
+            # 请求体预先序列化，Content-Type 已在会话头中设置
+            body = json_dumps(data) if data is not None and method in _BODY_METHODS else None
+            response = self.session.request(method, url, data=body, params=params, timeout=self.timeout)
         except requests.exceptions.RequestException as e:
-            raise Exception(f"请求失败: {str(e)}")
+            # 重试已由 Session 适配器处理，这里只处理连接层面的失败
+            raise CloudflareAPIError(_ERR_REQUEST, str(e)) from e
+        
+        # 成功时直接解析原始字节，响应文本只在出错时才解码
+        status = response.status_code
+        if status >= 400:
+            template = _STATUS_ERRORS.get(status, _ERR_REQUEST)
+            debug_info = None
+            if status == 400 and listing:
+                template = _ERR_400
+                debug_info = {
+                    'url': url,
+                    'params': params,
+                    'api_token_type': 'Token' if self.is_token else 'Key'
+                }
+            raise CloudflareAPIError(template, f"HTTP {status} - {_error_detail(response)}",
+                                     status=status, params=params, debug_info=debug_info)
+        
+        try:
+            result = json_loads(response.content)
+        except ValueError as e:
+            raise CloudflareAPIError(_ERR_REQUEST, f"响应不是有效的 JSON: {e}") from e
+        
+        if not result.get('success', False):
+            raise CloudflareAPIError(_ERR_REQUEST, f"Cloudflare API 错误: {_format_api_errors(result.get('errors', []))}",
+                                     status=status, params=params)
+        
+        return result
     
     def get_zone_id(self, domain: str) -> str:
         """
@@ -163,8 +457,9 @@ class CloudflareManager:
         Returns:
             Zone ID
         """
-        if domain in self.zone_ids:
-            return self.zone_ids[domain]
+        zone_id = self.zone_ids.get(domain)
+        if zone_id:
+            return zone_id
         
         raise Exception(f"未找到域名 '{domain}' 的 Zone ID")
     
@@ -180,100 +475,71 @@ class CloudflareManager:
         Returns:
             DNS 记录列表
         """
-        endpoint = f'zones/{zone_id}/dns_records'
+        url = self._zone_url(zone_id, 'dns_records')
         
-        try:
-            # 首先验证 Zone 访问权限
-            zone_valid, zone_msg = self.verify_zone_access(zone_id)
-            if not zone_valid:
-                raise Exception(f"Zone 访问验证失败: {zone_msg}")
-            
-            # 构建查询参数
-            params = {}
-            if record_type:
-                params['type'] = record_type
-            
-            # 修复：分步查询，避免复杂的 name 参数问题
-            url = self.base_url + endpoint.lstrip('/')
-            response = requests.get(url, headers=self.headers, params=params, timeout=self.timeout)
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            if not result.get('success', False):
-                errors = result.get('errors', [])
-                error_details = []
-                for err in errors:
-                    if isinstance(err, dict):
-                        error_details.append(f"Code: {err.get('code', 'N/A')}, Message: {err.get('message', str(err))}")
-                    else:
-                        error_details.append(str(err))
-                raise Exception(f"Cloudflare API 错误: {'; '.join(error_details)}")
-            
-            records = result.get('result', [])
-            
-            # 如果指定了 name，手动过滤结果
-            if name:
-                filtered_records = []
-                for record in records:
-                    if record.get('name', '').lower() == name.lower():
-                        filtered_records.append(record)
-                return filtered_records
-            
-            return records
-            
-        except requests.exceptions.RequestException as e:
-            error_msg = str(e)
+        # 首先验证 Zone 访问权限
+        zone_valid, zone_msg = self.verify_zone_access(zone_id)
+        if not zone_valid:
+            raise Exception(f"Zone 访问验证失败: {zone_msg}")
+        
+        # 构建查询参数，type 和 name 交由 Cloudflare 在服务端过滤
+        params = {k: v for k, v in {'type': record_type, 'name': name}.items() if v}
+        params['per_page'] = self.page_size
+        
+        records = []
+        page = 1
+        while True:
+            params['page'] = page
+            result = self._request('GET', url, params=params, listing=True)
+            records.extend(result.get('result', []))
             
-            # 提供更详细的错误分析
-            if "400 Client Error" in error_msg:
-                debug_info = {
-                    'zone_id': zone_id,
-                    'params': params,
-                    'api_token_type': 'Token' if self.is_token else 'Key',
-                    'error': error_msg
-                }
-                
-                # 尝试获取响应内容以获得更多信息
-                try:
-                    if hasattr(e, 'response') and e.response:
-                        response_text = e.response.text
-                        debug_info['response_body'] = response_text
-                except:
-                    pass
-                
-                raise Exception(f"DNS 记录查询失败 (400 错误):\n"
-                              f"可能原因:\n"
-                              f"1. API Token 缺少 Zone:Read 权限\n"
-                              f"2. Zone ID '{zone_id}' 不正确或无权访问\n"
-                              f"3. API Token 已过期或被撤销\n"
-                              f"4. 查询参数格式错误\n"
-                              f"调试信息: {debug_info}\n"
-                              f"原始错误: {error_msg}")
-            elif "401" in error_msg:
-                raise Exception(f"API Token 认证失败 (401 错误):\n"
-                              f"请检查:\n"
-                              f"1. API Token 是否正确\n"
-                              f"2. Token 是否已过期\n"
-                              f"3. Token 权限是否足够\n"
-                              f"原始错误: {error_msg}")
-            elif "403" in error_msg:
-                raise Exception(f"API Token 权限不足 (403 错误):\n"
-                              f"请确保 API Token 具有以下权限:\n"
-                              f"1. Zone:Read\n"
-                              f"2. DNS:Edit\n"
-                              f"3. 对应 Zone 的访问权限\n"
-                              f"原始错误: {error_msg}")
-            else:
-                raise Exception(f"DNS 记录查询请求失败: {error_msg}")
+            if page >= result.get('result_info', {}).get('total_pages', 1):
+                return records
+            page += 1
 
-    def create_dns_record(self, zone_id: str, record_type: str, name: str, content: str, 
-                         ttl: int = 3600, proxied: bool = True, priority: int = None) -> Dict[str, Any]:
+    def _iter_dns_records(self, zone_id: str) -> Iterator[Dict[str, Any]]:
         """
-        创建 DNS 记录
+        分页遍历 Zone 下的全部 DNS 记录，逐页产出，首页之后的剩余页并发获取
         
         Args:
             zone_id: Zone ID
+        
+        Returns:
+            DNS 记录迭代器
+        """
+        endpoint = self._zone_url(zone_id, 'dns_records')
+        per_page = self.page_size
+        
+        first = self._request('GET', endpoint, params={'page': 1, 'per_page': per_page}, listing=True)
+        yield from first.get('result', [])
+        
+        total_pages = first.get('result_info', {}).get('total_pages', 1)
+        if total_pages <= 1:
+            return
+        
+        # 已知总页数后，剩余页并发获取，按页序产出
+        def fetch_page(page: int) -> List[Dict[str, Any]]:
+            return self._request('GET', endpoint, params={'page': page, 'per_page': per_page},
+                                 listing=True).get('result', [])
+        
+        # 同时只保留 workers 个未完成的请求，取走一页再提交下一页，调用方可以边取边处理
+        workers = min(self.concurrency, total_pages - 1)
+        pages = iter(range(2, total_pages + 1))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque(executor.submit(fetch_page, page) for page in islice(pages, workers))
+            while pending:
+                records = pending.popleft().result()
+                next_page = next(pages, None)
+                if next_page is not None:
+                    pending.append(executor.submit(fetch_page, next_page))
+                yield from records
+
+    def _build_record_data(self, record_type: str, name: str, content: str, ttl: int = DEFAULT_TTL,
+                           proxied: bool = True, priority: int = None) -> Dict[str, Any]:
+        """
+        构建 DNS 记录的请求数据
+        
+        Args:
             record_type: 记录类型
             name: 记录名称
             content: 记录内容
@@ -282,7 +548,7 @@ class CloudflareManager:
             priority: 优先级 (MX 记录)
         
         Returns:
-            创建的记录信息
+            请求数据
         """
         data = {
             'type': record_type,
@@ -292,18 +558,38 @@ class CloudflareManager:
         }
         
         # 只有 A、AAAA、CNAME 记录支持代理
-        if record_type in ['A', 'AAAA', 'CNAME']:
+        if record_type in PROXIED_RECORD_TYPES:
             data['proxied'] = proxied
         
         # MX 记录需要优先级
         if record_type == 'MX' and priority is not None:
             data['priority'] = priority
         
-        result = self._request('POST', f'zones/{zone_id}/dns_records', data)
+        return data
+
+    def create_dns_record(self, zone_id: str, record_type: str, name: str, content: str, 
+                         ttl: int = DEFAULT_TTL, proxied: bool = True, priority: int = None) -> Dict[str, Any]:
+        """
+        创建 DNS 记录
+        
+        Args:
+            zone_id: Zone ID
+            record_type: 记录类型
+            name: 记录名称
+            content: 记录内容
+            ttl: TTL 值
+            proxied: 是否启用代理
+            priority: 优先级 (MX 记录)
+        
+        Returns:
+            创建的记录信息
+        """
+        data = self._build_record_data(record_type, name, content, ttl, proxied, priority)
+        result = self._request('POST', self._zone_url(zone_id, 'dns_records'), data)
         return result.get('result', {})
     
     def update_dns_record(self, zone_id: str, record_id: str, record_type: str, name: str, 
-                         content: str, ttl: int = 3600, proxied: bool = True, priority: int = None) -> Dict[str, Any]:
+                         content: str, ttl: int = DEFAULT_TTL, proxied: bool = True, priority: int = None) -> Dict[str, Any]:
         """
         更新 DNS 记录
         
@@ -320,22 +606,8 @@ class CloudflareManager:
         Returns:
             更新的记录信息
         """
-        data = {
-            'type': record_type,
-            'name': name,
-            'content': content,
-            'ttl': ttl,
-        }
-        
-        # 只有 A、AAAA、CNAME 记录支持代理
-        if record_type in ['A', 'AAAA', 'CNAME']:
-            data['proxied'] = proxied
-        
-        # MX 记录需要优先级
-        if record_type == 'MX' and priority is not None:
-            data['priority'] = priority
-        
-        result = self._request('PUT', f'zones/{zone_id}/dns_records/{record_id}', data)
+        data = self._build_record_data(record_type, name, content, ttl, proxied, priority)
+        result = self._request('PUT', self._zone_url(zone_id, f'dns_records/{record_id}'), data)
         return result.get('result', {})
     
     def delete_dns_record(self, zone_id: str, record_id: str) -> bool:
@@ -350,12 +622,41 @@ class CloudflareManager:
             是否删除成功
         """
         try:
-            self._request('DELETE', f'zones/{zone_id}/dns_records/{record_id}')
+            self._request('DELETE', self._zone_url(zone_id, f'dns_records/{record_id}'))
             return True
         except Exception:
             return False
     
-    def sync_domain_records(self, domain: str, subdomain: str, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def batch_dns_records(self, zone_id: str, posts: List[Dict[str, Any]] = None,
+                          patches: List[Dict[str, Any]] = None,
+                          puts: List[Dict[str, Any]] = None,
+                          deletes: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        批量提交 DNS 记录变更
+        
+        Cloudflare 在一次请求中按 删除、修改、覆盖、创建 的顺序原子执行，任一操作失败则全部回滚。
+        
+        Args:
+            zone_id: Zone ID
+            posts: 待创建的记录数据
+            patches: 待修改的记录数据 (需包含 id)
+            puts: 待整体覆盖的记录数据 (需包含 id)
+            deletes: 待删除的记录 (形如 {'id': ...})
+        
+        Returns:
+            各类操作的结果，键为 posts、patches、puts、deletes
+        """
+        payload = {
+            'deletes': deletes or [],
+            'patches': patches or [],
+            'puts': puts or [],
+            'posts': posts or []
+        }
+        result = self._request('POST', self._zone_url(zone_id, 'dns_records/batch'), payload)
+        return result.get('result', {})
+    
+    def sync_domain_records(self, domain: str, subdomain: str, records: List[Dict[str, Any]],
+                            debug: bool = False) -> Dict[str, Any]:
         """
         同步域名记录
         
@@ -363,6 +664,7 @@ class CloudflareManager:
             domain: 主域名
             subdomain: 子域名
             records: 记录列表
+            debug: 是否先执行调试查询 (额外验证 Zone 访问权限)
         
         Returns:
             同步结果
@@ -375,118 +677,183 @@ class CloudflareManager:
         else:
             full_name = f"{subdomain}.{domain}"
         
+        # 非 @ 记录名称的公共后缀 (子域名为 @ 时 full_name 即主域名)
+        name_suffix = f".{full_name}"
+        
         result = {
             'domain': domain,
             'subdomain': subdomain,
             'created': [],
             'updated': [],
             'deleted': [],
+            'unchanged': [],
             'errors': [],
             'debug_info': {}
         }
         
-        # 添加调试信息
-        try:
-            debug_info = self.debug_dns_query(zone_id, full_name)
-            result['debug_info'] = debug_info
-            
-            if not debug_info.get('zone_access', {}).get('valid', False):
-                result['errors'].append(f"Zone 访问失败: {debug_info['zone_access']['message']}")
-                return result
+        # 添加调试信息 (仅调试模式，Zone 无权访问时下方获取记录同样会报错)
+        if debug:
+            try:
+                # 记录列表在下方获取现有记录时一并统计，这里不再重复查询
+                debug_info = self.debug_dns_query(zone_id, full_name, list_records=False)
+                result['debug_info'] = debug_info
                 
-        except Exception as e:
-            result['errors'].append(f"调试查询失败: {str(e)}")
+                if not debug_info.get('zone_access', {}).get('valid', False):
+                    result['errors'].append(f"Zone 访问失败: {debug_info['zone_access']['message']}")
+                    return result
+                    
+            except Exception as e:
+                result['errors'].append(f"调试查询失败: {str(e)}")
         
         # 获取现有记录 - 修复：直接获取所有记录，然后手动过滤
-        existing_records = []
+        existing_map = {}
         try:
-            all_records = self._request('GET', f'zones/{zone_id}/dns_records')
-            all_records_list = all_records.get('result', [])
-            
-            # 手动过滤相关记录
+            # 预先计算每条目标记录的完整名称，后续各步骤共用
+            targets = []
             for record in records:
                 name = record['name']
-                if name == '@':
-                    record_name = full_name
-                else:
-                    record_name = f"{name}.{full_name}" if subdomain != '@' else f"{name}.{domain}"
-                
-                # 查找匹配的现有记录
-                matching_records = [
-                    r for r in all_records_list 
-                    if r.get('name', '').lower() == record_name.lower()
-                ]
-                existing_records.extend(matching_records)
+                record_name = full_name if name == '@' else f"{name}{name_suffix}"
+                targets.append((record['type'], record_name, record))
+            wanted_names = {record_name.lower() for _, record_name, _ in targets}
+            
+            # 逐页读取 Zone 记录，只保留与目标记录同名的部分，同时建立记录映射
+            total_records = 0
+            for r in self._iter_dns_records(zone_id):
+                total_records += 1
+                # Cloudflare 记录名不区分大小写，映射键统一使用小写名称
+                name_lower = r.get('name', '').lower()
+                if name_lower in wanted_names:
+                    existing_map[(r['type'], name_lower)] = r
+            
+            result['debug_info']['total_records'] = total_records
+            full_name_lower = full_name.lower()
+            result['debug_info']['matching_records'] = sum(
+                1 for _, name_lower in existing_map if name_lower == full_name_lower
+            )
                 
         except Exception as e:
             result['errors'].append(f"获取现有记录失败: {str(e)}")
             return result
         
-        # 创建记录映射
-        existing_map = {}
-        for record in existing_records:
-            key = f"{record['type']}:{record['name']}"
-            existing_map[key] = record
-        
-        # 处理新记录
-        new_map = {}
-        for record in records:
-            record_type = record['type']
-            name = record['name']
-            
-            # 修复：构建记录名称逻辑
-            if name == '@':
-                record_name = full_name
-            else:
-                record_name = f"{name}.{full_name}" if subdomain != '@' else f"{name}.{domain}"
-            
-            key = f"{record_type}:{record_name}"
-            new_map[key] = record
+        # 计算需要创建、更新和删除的记录
+        new_keys = set()
+        to_create = []
+        to_update = []
+        for record_type, record_name, record in targets:
+            key = (record_type, record_name.lower())
+            new_keys.add(key)
             
             try:
-                if key in existing_map:
-                    # 更新现有记录
-                    existing_record = existing_map[key]
-                    updated_record = self.update_dns_record(
-                        zone_id=zone_id,
-                        record_id=existing_record['id'],
-                        record_type=record_type,
-                        name=record_name,
-                        content=record['content'],
-                        ttl=record.get('ttl', 3600),
-                        proxied=record.get('proxied', True),
-                        priority=record.get('priority')
-                    )
-                    result['updated'].append(updated_record)
-                else:
-                    # 创建新记录
-                    created_record = self.create_dns_record(
-                        zone_id=zone_id,
-                        record_type=record_type,
-                        name=record_name,
-                        content=record['content'],
-                        ttl=record.get('ttl', 3600),
-                        proxied=record.get('proxied', True),
-                        priority=record.get('priority')
-                    )
-                    result['created'].append(created_record)
-            
+                fields = {
+                    'record_type': record_type,
+                    'name': record_name,
+                    'content': record['content'],
+                    'ttl': record.get('ttl', DEFAULT_TTL),
+                    'proxied': record.get('proxied', True),
+                    'priority': record.get('priority')
+                }
             except Exception as e:
-                result['errors'].append(f"处理记录 {key} 时出错: {str(e)}")
+                result['errors'].append(f"处理记录 {':'.join(key)} 时出错: {str(e)}")
+                continue
+            
+            if key in existing_map:
+                existing_record = existing_map[key]
+                
+                # 内容未变化时跳过，不发送更新请求
+                if _record_fingerprint(existing_record) == _record_fingerprint({**record, 'name': record_name}):
+                    result['unchanged'].append(existing_record)
+                    continue
+                
+                to_update.append((key, existing_record, fields))
+            else:
+                to_create.append((key, fields))
         
         # 删除不再需要的记录
-        for key, existing_record in existing_map.items():
-            if key not in new_map:
-                try:
-                    if self.delete_dns_record(zone_id, existing_record['id']):
-                        result['deleted'].append(existing_record)
-                    else:
-                        result['errors'].append(f"删除记录 {key} 失败")
-                except Exception as e:
-                    result['errors'].append(f"删除记录 {key} 时出错: {str(e)}")
+        to_delete = [(key, existing_map[key]) for key in existing_map.keys() - new_keys]
         
+        if not (to_create or to_update or to_delete):
+            return result
+        
+        # 优先通过批量接口在一次请求中提交全部变更 (Cloudflare 保证原子性)，
+        # 被明确拒绝时没有任何变更生效，退回逐条请求以便定位具体出错的记录；
+        # 其他失败无法确定批量请求是否已执行，逐条重放可能重复创建或删除，直接报告错误
+        try:
+            batch_result = self.batch_dns_records(
+                zone_id,
+                posts=[self._build_record_data(**fields) for _, fields in to_create],
+                puts=[{'id': record['id'], **self._build_record_data(**fields)} for _, record, fields in to_update],
+                deletes=[{'id': record['id']} for _, record in to_delete]
+            )
+            result['created'].extend(batch_result.get('posts') or [])
+            result['updated'].extend(batch_result.get('puts') or [])
+            result['deleted'].extend(batch_result.get('deletes') or [])
+            return result
+        except Exception as e:
+            if not (isinstance(e, CloudflareAPIError) and e.rejected):
+                result['errors'].append(f"批量提交变更失败: {str(e)}")
+                return result
+            result['debug_info']['batch_error'] = str(e)
+        
+        self._apply_changes_individually(zone_id, to_create, to_update, to_delete, result)
         return result
 
+    def _apply_changes_individually(self, zone_id: str, to_create: List[Tuple], to_update: List[Tuple],
+                                    to_delete: List[Tuple], result: Dict[str, Any]):
+        """
+        逐条提交记录变更，在线程池中并发执行
+        
+        与批量接口的执行顺序一致，先完成全部删除再提交更新和创建，
+        避免同名记录更换类型 (如 CNAME 改为 A) 时新记录与旧记录冲突
+        
+        Args:
+            zone_id: Zone ID
+            to_create: 待创建记录 [(key, fields)]
+            to_update: 待更新记录 [(key, existing_record, fields)]
+            to_delete: 待删除记录 [(key, existing_record)]
+            result: 同步结果，执行结果追加到其中
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            deletes = {}
+            for key, existing_record in to_delete:
+                future = executor.submit(self.delete_dns_record, zone_id, existing_record['id'])
+                deletes[future] = ('deleted', key, existing_record)
+            self._collect_changes(deletes, result)
+            
+            futures = {}
+            for key, existing_record, fields in to_update:
+                future = executor.submit(self.update_dns_record, zone_id, existing_record['id'], **fields)
+                futures[future] = ('updated', key, existing_record)
+            for key, fields in to_create:
+                future = executor.submit(self.create_dns_record, zone_id, **fields)
+                futures[future] = ('created', key, None)
+            self._collect_changes(futures, result)
+
+    def _collect_changes(self, futures: Dict[Any, Tuple], result: Dict[str, Any]):
+        """
+        等待逐条提交的变更完成，并将结果追加到同步结果中
+        
+        Args:
+            futures: {future: (操作, key, 原记录)}
+            result: 同步结果
+        """
+        for future in as_completed(futures):
+            action, key, existing_record = futures[future]
+            try:
+                outcome = future.result()
+            except Exception as e:
+                if action == 'deleted':
+                    result['errors'].append(f"删除记录 {':'.join(key)} 时出错: {str(e)}")
+                else:
+                    result['errors'].append(f"处理记录 {':'.join(key)} 时出错: {str(e)}")
+                continue
+            
+            if action != 'deleted':
+                result[action].append(outcome)
+            elif outcome:
+                result['deleted'].append(existing_record)
+            else:
+                result['errors'].append(f"删除记录 {':'.join(key)} 失败")
+
     def verify_zone_access(self, zone_id: str) -> Tuple[bool, str]:
         """
         验证 Zone 访问权限
@@ -497,16 +864,25 @@ class CloudflareManager:
         Returns:
             (是否有访问权限, 错误信息)
         """
+        if self.skip_zone_verify:
+            return True, "已跳过 Zone 访问验证"
+        
+        cached = self._zone_cache.get(zone_id)
+        if cached and time.monotonic() - cached[0] < self.cache_ttl:
+            return True, cached[1]
+        
         try:
             url = f"{self.base_url}zones/{zone_id}"
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
+            response = self.session.get(url, timeout=self.timeout)
             
             if response.status_code == 200:
-                result = response.json()
+                result = json_loads(response.content)
                 if result.get('success', False):
                     zone_info = result.get('result', {})
                     zone_name = zone_info.get('name', 'Unknown')
-                    return True, f"Zone '{zone_name}' 访问正常"
+                    message = f"Zone '{zone_name}' 访问正常"
+                    self._zone_cache[zone_id] = (time.monotonic(), message)
+                    return True, message
                 else:
                     errors = result.get('errors', [])
                     error_msg = '; '.join([err.get('message', str(err)) for err in errors])
@@ -525,13 +901,14 @@ class CloudflareManager:
         except Exception as e:
             return False, f"Zone 访问验证异常: {str(e)}"
 
-    def debug_dns_query(self, zone_id: str, name: str = None) -> Dict[str, Any]:
+    def debug_dns_query(self, zone_id: str, name: str = None, list_records: bool = True) -> Dict[str, Any]:
         """
         调试 DNS 查询，提供详细的诊断信息
         
         Args:
             zone_id: Zone ID
             name: 记录名称 (可选)
+            list_records: 是否查询记录列表 (调用方自行获取记录时可关闭)
             
         Returns:
             调试信息
@@ -542,7 +919,7 @@ class CloudflareManager:
             'api_token_type': 'Token' if self.is_token else 'Key',
             'base_url': self.base_url,
             'timeout': self.timeout,
-            'headers_masked': {k: v if k not in ['Authorization', 'X-Auth-Key'] else '***' for k, v in self.headers.items()}
+            'headers_masked': self._redacted_headers
         }
         
         # 验证 Zone 访问权限
@@ -552,7 +929,7 @@ class CloudflareManager:
             'message': zone_msg
         }
         
-        if not zone_valid:
+        if not zone_valid or not list_records:
             return debug_info
             
         # 尝试获取所有记录（不使用 name 过滤）
@@ -561,10 +938,11 @@ class CloudflareManager:
             debug_info['total_records'] = len(records)
             
             if name:
-                # 手动过滤记录
+                # 手动过滤记录 (查询名称只转换一次小写)
+                name_lower = name.lower()
                 matching_records = [
                     record for record in records
-                    if record.get('name', '').lower() == name.lower()
+                    if record.get('name', '').lower() == name_lower
                 ]
                 debug_info['matching_records'] = len(matching_records)
                 debug_info['matching_record_details'] = [
@@ -607,10 +985,16 @@ def main():
     
     args = parser.parse_args()
     
+    manager = None
     try:
-        manager = CloudflareManager(args.api_key, args.email, args.config)
+        # 仅在调试时额外验证 Token
+        manager = CloudflareManager(args.api_key, args.email, args.config,
+                                    validate=args.debug and args.action != 'debug')
         
         if args.action == 'debug':
+            # 调试操作用于检查 Token 是否有效，总是重新验证，不使用缓存结果
+            manager._validate_token(use_cache=False)
+            
             # 新增：调试模式
             zone_id = manager.get_zone_id(args.domain)
             full_name = f"{args.subdomain}.{args.domain}" if args.subdomain != '@' else args.domain
@@ -646,7 +1030,7 @@ def main():
                 return 1
             
             records = config.get('records', [])
-            result = manager.sync_domain_records(args.domain, args.subdomain, records)
+            result = manager.sync_domain_records(args.domain, args.subdomain, records, debug=args.debug)
             
             print("同步结果:")
             print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -663,6 +1047,9 @@ def main():
             print("\n完整错误堆栈:")
             traceback.print_exc()
         return 1
+    finally:
+        if manager is not None:
+            manager.close()
 
 
 if __name__ == "__main__":
@@ -7,8 +7,10 @@ DNS 工具函数模块
 此模块提供了 DNS 记录相关的工具函数。
 """
 
+import random
 import socket
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from typing import Dict, List, Any, Optional, Union, Tuple
 
 try:
@@ -18,6 +20,97 @@ except ImportError:
     DNS_RESOLVER_AVAILABLE = False
 
 
+# 共享的 DNS 解析器，首次使用时创建，避免每次查询都重新读取 /etc/resolv.conf
+_shared_resolver = None
+
+# 解析结果缓存 {(域名, 记录类型): (过期时间, 应答)}，按记录 TTL 过期，最长缓存 _DNS_CACHE_MAX_TTL 秒
+_DNS_CACHE: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+_DNS_CACHE_MAXSIZE = 1024
+_DNS_CACHE_MAX_TTL = 300
+
+
+# 标准库解析不支持单次查询的超时，放到后台线程中执行以便按超时放弃等待
+# (线程池只在未安装 dnspython、走标准库解析时才创建)
+_fallback_executor = None
+
+
+def _get_fallback_executor() -> ThreadPoolExecutor:
+    """获取标准库解析使用的线程池"""
+    global _fallback_executor
+    if _fallback_executor is None:
+        _fallback_executor = ThreadPoolExecutor(max_workers=4)
+    return _fallback_executor
+
+
+def _getaddrinfo(domain: str, family: int, flags: int, timeout: int) -> List[tuple]:
+    """
+    在后台线程中调用 socket.getaddrinfo，超时后放弃等待 (不修改全局 socket 超时)
+    
+    Args:
+        domain: 域名
+        family: 地址族 (AF_INET / AF_INET6 / AF_UNSPEC)
+        flags: getaddrinfo 标志
+        timeout: 超时时间 (秒)
+    
+    Returns:
+        getaddrinfo 结果列表
+    """
+    future = _get_fallback_executor().submit(socket.getaddrinfo, domain, None, family, socket.SOCK_STREAM, 0, flags)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        raise TimeoutError(f"getaddrinfo {domain} 超时 ({timeout}s)") from None
+
+
+def _get_resolver() -> 'dns.resolver.Resolver':
+    """获取共享的 DNS 解析器"""
+    global _shared_resolver
+    if _shared_resolver is None:
+        _shared_resolver = dns.resolver.Resolver()
+    return _shared_resolver
+
+
+def _resolve(domain: str, record_type: str, timeout: int) -> 'dns.resolver.Answer':
+    """
+    使用共享解析器查询记录，应答在记录 TTL (最长 _DNS_CACHE_MAX_TTL 秒) 内直接从缓存返回
+    
+    Args:
+        domain: 域名
+        record_type: 记录类型
+        timeout: 超时时间 (秒)
+    
+    Returns:
+        dnspython 应答
+    """
+    key = (domain.lower(), record_type)
+    now = time.monotonic()
+    cached = _DNS_CACHE.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+    
+    answers = _get_resolver().resolve(domain, record_type, lifetime=timeout)
+    
+    # 缓存已满时淘汰最早写入的条目
+    if key not in _DNS_CACHE and len(_DNS_CACHE) >= _DNS_CACHE_MAXSIZE:
+        _DNS_CACHE.pop(next(iter(_DNS_CACHE)), None)
+    _DNS_CACHE[key] = (now + min(answers.rrset.ttl, _DNS_CACHE_MAX_TTL), answers)
+    return answers
+
+
+def dns_cache_clear(domain: Optional[str] = None, record_type: Optional[str] = None) -> None:
+    """
+    清除解析结果缓存
+    
+    Args:
+        domain: 域名 (可选，与 record_type 同时指定时只清除该条缓存，否则清除全部)
+        record_type: 记录类型 (可选)
+    """
+    if domain and record_type:
+        _DNS_CACHE.pop((domain.lower(), record_type), None)
+    else:
+        _DNS_CACHE.clear()
+
+
 def resolve_a_record(domain: str, timeout: int = 5) -> Tuple[List[str], Optional[str]]:
     """
     解析 A 记录
@@ -31,16 +124,12 @@ def resolve_a_record(domain: str, timeout: int = 5) -> Tuple[List[str], Optional
     """
     try:
         if DNS_RESOLVER_AVAILABLE:
-            resolver = dns.resolver.Resolver()
-            resolver.timeout = timeout
-            resolver.lifetime = timeout
-            answers = resolver.resolve(domain, 'A')
+            answers = _resolve(domain, 'A', timeout)
             return [str(answer) for answer in answers], None
         else:
-            # 使用标准库
-            socket.setdefaulttimeout(timeout)
-            addresses = socket.gethostbyname_ex(domain)[2]
-            return addresses, None
+            # 使用标准库，只查询 IPv4 地址
+            infos = _getaddrinfo(domain, socket.AF_INET, socket.AI_ADDRCONFIG, timeout)
+            return list(dict.fromkeys(info[4][0] for info in infos)), None
     except Exception as e:
         return [], f"解析 A 记录错误: {str(e)}"
 
@@ -58,19 +147,14 @@ def resolve_aaaa_record(domain: str, timeout: int = 5) -> Tuple[List[str], Optio
     """
     try:
         if DNS_RESOLVER_AVAILABLE:
-            resolver = dns.resolver.Resolver()
-            resolver.timeout = timeout
-            resolver.lifetime = timeout
-            answers = resolver.resolve(domain, 'AAAA')
+            answers = _resolve(domain, 'AAAA', timeout)
             return [str(answer) for answer in answers], None
         else:
-            # 使用标准库
-            socket.setdefaulttimeout(timeout)
-            # 获取 IPv6 地址
+            # 使用标准库，只查询 IPv6 地址
             addresses = []
             try:
-                infos = socket.getaddrinfo(domain, None, socket.AF_INET6)
-                addresses = [info[4][0] for info in infos]
+                infos = _getaddrinfo(domain, socket.AF_INET6, socket.AI_ADDRCONFIG, timeout)
+                addresses = list(dict.fromkeys(info[4][0] for info in infos))
             except socket.gaierror:
                 pass
             return addresses, None
@@ -89,21 +173,13 @@ def resolve_cname_record(domain: str, timeout: int = 5) -> Tuple[List[str], Opti
     Returns:
         (CNAME列表, 错误信息)
     """
+    # 标准库只能得到 CNAME 链末端的规范名称，无法得到记录本身的目标
+    if not DNS_RESOLVER_AVAILABLE:
+        return [], "DNS 解析库不可用，无法解析 CNAME 记录"
+        
     try:
-        if DNS_RESOLVER_AVAILABLE:
-            resolver = dns.resolver.Resolver()
-            resolver.timeout = timeout
-            resolver.lifetime = timeout
-            answers = resolver.resolve(domain, 'CNAME')
-            return [str(answer.target) for answer in answers], None
-        else:
-            # 使用标准库
-            socket.setdefaulttimeout(timeout)
-            try:
-                cname = socket.gethostbyname_ex(domain)[0]
-                return [cname] if cname != domain else [], None
-            except socket.gaierror:
-                return [], None
+        answers = _resolve(domain, 'CNAME', timeout)
+        return [str(answer.target) for answer in answers], None
     except Exception as e:
         return [], f"解析 CNAME 记录错误: {str(e)}"
 
@@ -123,10 +199,7 @@ def resolve_txt_record(domain: str, timeout: int = 5) -> Tuple[List[str], Option
         return [], "DNS 解析库不可用，无法解析 TXT 记录"
         
     try:
-        resolver = dns.resolver.Resolver()
-        resolver.timeout = timeout
-        resolver.lifetime = timeout
-        answers = resolver.resolve(domain, 'TXT')
+        answers = _resolve(domain, 'TXT', timeout)
         return [str(answer).strip('"') for answer in answers], None
     except Exception as e:
         return [], f"解析 TXT 记录错误: {str(e)}"
@@ -147,10 +220,7 @@ def resolve_mx_record(domain: str, timeout: int = 5) -> Tuple[List[Dict[str, Uni
         return [], "DNS 解析库不可用，无法解析 MX 记录"
         
     try:
-        resolver = dns.resolver.Resolver()
-        resolver.timeout = timeout
-        resolver.lifetime = timeout
-        answers = resolver.resolve(domain, 'MX')
+        answers = _resolve(domain, 'MX', timeout)
         
         mx_records = []
         for answer in answers:
@@ -164,6 +234,46 @@ def resolve_mx_record(domain: str, timeout: int = 5) -> Tuple[List[Dict[str, Uni
         return [], f"解析 MX 记录错误: {str(e)}"
 
 
+def _normalize_host(value: str) -> str:
+    """去掉主机名末尾的点并转为小写，便于比较"""
+    return (value[:-1] if value.endswith('.') else value).lower()
+
+
+def _match_value(values: List[str], expected: str) -> bool:
+    """精确匹配 (A / AAAA / TXT)"""
+    return expected in values
+
+
+def _match_host(values: List[str], expected: str) -> bool:
+    """忽略大小写和末尾点匹配主机名 (CNAME)"""
+    expected = _normalize_host(expected)
+    return any(_normalize_host(value) == expected for value in values)
+
+
+def _match_mx(records: List[Dict[str, Union[str, int]]], expected: str) -> bool:
+    """忽略大小写和末尾点匹配邮件服务器 (MX)"""
+    expected = _normalize_host(expected)
+    return any(_normalize_host(record['exchange']) == expected for record in records)
+
+
+def _cache_remaining(domain: str, record_type: str) -> Optional[float]:
+    """获取缓存应答的剩余有效时间 (秒)，没有缓存时返回 None"""
+    cached = _DNS_CACHE.get((domain.lower(), record_type))
+    if cached is None:
+        return None
+    return max(cached[0] - time.monotonic(), 0.0)
+
+
+# 各记录类型的解析函数与比较函数
+_PROPAGATION_CHECKS = {
+    'A': (resolve_a_record, _match_value),
+    'AAAA': (resolve_aaaa_record, _match_value),
+    'CNAME': (resolve_cname_record, _match_host),
+    'TXT': (resolve_txt_record, _match_value),
+    'MX': (resolve_mx_record, _match_mx),
+}
+
+
 def check_dns_propagation(domain: str, record_type: str, expected_value: str, timeout: int = 5, max_retries: int = 10, retry_delay: int = 30) -> Tuple[bool, Optional[str]]:
     """
     检查 DNS 记录传播
@@ -173,61 +283,37 @@ def check_dns_propagation(domain: str, record_type: str, expected_value: str, ti
         record_type: 记录类型
         expected_value: 预期值
         timeout: 超时时间 (秒)
-        max_retries: 最大重试次数
-        retry_delay: 重试延迟 (秒)
+        max_retries: 最大查询次数 (总等待时间用完后的查询不再等待)
+        retry_delay: 初始重试延迟 (秒)，之后按指数退避增长；
+            总等待时间不超过 (max_retries - 1) * retry_delay 秒 (默认约 4.5 分钟)
     
     Returns:
         (是否传播完成, 错误信息)
     """
+    check = _PROPAGATION_CHECKS.get(record_type)
+    if check is None:
+        return False, f"不支持检查 {record_type} 记录的传播"
+    resolve, matches = check
+    
+    # 总等待时间与固定间隔重试时相同
+    budget = (max_retries - 1) * retry_delay
     for i in range(max_retries):
-        if i > 0:
-            time.sleep(retry_delay)
+        if i > 0 and budget > 0:
+            # 指数退避，但不超过缓存应答的剩余 TTL (过期前重新查询只会得到同样的结果)，并加入随机抖动
+            delay = retry_delay * 2 ** (i - 1)
+            remaining = _cache_remaining(domain, record_type)
+            if remaining is not None:
+                delay = max(min(delay, remaining), 1)
+            delay = min(delay + random.uniform(0, 1), budget)
+            time.sleep(delay)
+            budget -= delay
         
+        # 每次检查都必须重新查询，不能使用之前缓存的旧应答
+        dns_cache_clear(domain, record_type)
         try:
-            if record_type == 'A':
-                values, error = resolve_a_record(domain, timeout)
-                if error:
-                    continue
-                if expected_value in values:
-                    return True, None
-                
-            elif record_type == 'AAAA':
-                values, error = resolve_aaaa_record(domain, timeout)
-                if error:
-                    continue
-                if expected_value in values:
-                    return True, None
-                
-            elif record_type == 'CNAME':
-                values, error = resolve_cname_record(domain, timeout)
-                if error:
-                    continue
-                
-                expected = expected_value[:-1] if expected_value.endswith('.') else expected_value
-                for value in values:
-                    actual = value[:-1] if value.endswith('.') else value
-                    if expected.lower() == actual.lower():
-                        return True, None
-                
-            elif record_type == 'TXT':
-                values, error = resolve_txt_record(domain, timeout)
-                if error:
-                    continue
-                if expected_value in values:
-                    return True, None
-                
-            elif record_type == 'MX':
-                records, error = resolve_mx_record(domain, timeout)
-                if error:
-                    continue
-                
-                expected = expected_value[:-1] if expected_value.endswith('.') else expected_value
-                for record in records:
-                    exchange = record['exchange']
-                    exchange = exchange[:-1] if exchange.endswith('.') else exchange
-                    if expected.lower() == exchange.lower():
-                        return True, None
-        
+            values, error = resolve(domain, timeout)
+            if not error and matches(values, expected_value):
+                return True, None
         except Exception as e:
             continue
     
@@ -246,11 +332,5 @@ def get_record_fqdn(domain: str, subdomain: str, name: str = '@') -> str:
     Returns:
         完整域名
     """
-    if name == '@':
-        if subdomain == '@':
-            return domain
-        return f"{subdomain}.{domain}"
-    else:
-        if subdomain == '@':
-            return f"{name}.{domain}"
-        return f"{name}.{subdomain}.{domain}"
+    base = domain if subdomain == '@' else f"{subdomain}.{domain}"
+    return base if name == '@' else f"{name}.{base}"
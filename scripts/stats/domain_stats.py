@@ -7,18 +7,23 @@
 此模块提供了统计域名使用情况的功能。
 """
 
-import json
+import heapq
 import os
 import sys
+import time
 import datetime
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional, Tuple
 
 # 添加项目根目录到 Python 路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from scripts.validation.domain_validator import load_config
-from scripts.utils.common import load_json_file
+from scripts.utils.common import load_json_file, json_dumps
+
+# 并发读取子域名文件的线程数 (文件读取为 I/O 密集型)
+_LOAD_WORKERS = min(32, (os.cpu_count() or 1) * 4)
 
 
 def load_domain_config(file_path: str) -> Optional[Dict[str, Any]]:
@@ -38,6 +43,23 @@ def load_domain_config(file_path: str) -> Optional[Dict[str, Any]]:
     return data
 
 
+def load_subdomain_file(file_path: str) -> Tuple[Optional[Dict[str, Any]], float]:
+    """
+    加载子域名配置文件及其修改时间
+    
+    Args:
+        file_path: 配置文件路径
+    
+    Returns:
+        (配置信息字典, 修改时间)，修改时间获取失败时为 0
+    """
+    try:
+        mtime = os.path.getmtime(file_path)
+    except OSError:
+        mtime = 0
+    return load_domain_config(file_path), mtime
+
+
 def get_domain_files(domain: str, domains_dir: str = None) -> List[str]:
     """
     获取域名目录下的所有 JSON 文件
@@ -54,10 +76,13 @@ def get_domain_files(domain: str, domains_dir: str = None) -> List[str]:
     
     domain_dir = os.path.join(domains_dir, domain)
     
-    if not os.path.isdir(domain_dir):
+    # scandir 的目录项自带文件类型，无需逐个 stat
+    try:
+        with os.scandir(domain_dir) as entries:
+            return [entry.path for entry in entries
+                    if entry.name.endswith('.json') and entry.name != 'example.json' and entry.is_file()]
+    except (FileNotFoundError, NotADirectoryError):
         return []
-    
-    return [os.path.join(domain_dir, f) for f in os.listdir(domain_dir) if f.endswith('.json') and f != 'example.json']
 
 
 def collect_domain_stats(config: Dict[str, Any], domains_dir: str = None) -> Dict[str, Any]:
@@ -85,6 +110,9 @@ def collect_domain_stats(config: Dict[str, Any], domains_dir: str = None) -> Dic
         'recently_added': []
     }
     
+    users = stats['users']
+    record_types = stats['record_types']
+    
     # 统计域名信息
     for domain_config in config.get('domains', []):
         domain = domain_config.get('name')
@@ -101,36 +129,35 @@ def collect_domain_stats(config: Dict[str, Any], domains_dir: str = None) -> Dic
         stats['total_subdomains'] += subdomain_count
         stats['subdomains_by_domain'][domain] = subdomain_count
         
+        # 并发读取子域名文件，按原顺序汇总
+        with ThreadPoolExecutor(max_workers=_LOAD_WORKERS) as executor:
+            loaded = list(executor.map(load_subdomain_file, domain_files))
+        
         # 统计每个子域名的信息
-        for file_path in domain_files:
-            domain_config = load_domain_config(file_path)
+        for file_path, (domain_config, mtime) in zip(domain_files, loaded):
             if domain_config is None:
                 continue
                 
             subdomain = os.path.basename(file_path)[:-5]  # 去除 .json 后缀
             
-            # 获取文件修改时间
-            try:
-                mtime = os.path.getmtime(file_path)
-                mtime_str = datetime.datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
-            except Exception:
-                mtime = 0
-                mtime_str = 'Unknown'
+            # 格式化文件修改时间
+            mtime_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(mtime)) if mtime else 'Unknown'
             
             # 统计用户信息
-            owner = domain_config.get('owner', {})
+            owner = domain_config.get('owner') or {}
             github_username = owner.get('github')
             
             if github_username:
-                if github_username not in stats['users']:
-                    stats['users'][github_username] = {
+                user = users.get(github_username)
+                if user is None:
+                    user = users[github_username] = {
                         'name': owner.get('name', github_username),
                         'count': 0,
                         'domains': []
                     }
                 
-                stats['users'][github_username]['count'] += 1
-                stats['users'][github_username]['domains'].append({
+                user['count'] += 1
+                user['domains'].append({
                     'domain': domain,
                     'subdomain': subdomain,
                     'added_time': mtime_str,
@@ -141,7 +168,7 @@ def collect_domain_stats(config: Dict[str, Any], domains_dir: str = None) -> Dic
             for record in domain_config.get('records', []):
                 record_type = record.get('type')
                 if record_type:
-                    stats['record_types'][record_type] += 1
+                    record_types[record_type] += 1
             
             # 记录最近添加的域名
             stats['recently_added'].append({
@@ -158,7 +185,7 @@ def collect_domain_stats(config: Dict[str, Any], domains_dir: str = None) -> Dic
     
     # 用户域名数量排序
     top_users = []
-    for username, user_info in stats['users'].items():
+    for username, user_info in users.items():
         top_users.append({
             'username': username,
             'name': user_info['name'],
@@ -169,11 +196,9 @@ def collect_domain_stats(config: Dict[str, Any], domains_dir: str = None) -> Dic
     stats['top_users'] = sorted(top_users, key=lambda x: x['count'], reverse=True)
     
     # 最近添加的域名排序
-    stats['recently_added'] = sorted(stats['recently_added'], key=lambda x: x['timestamp'], reverse=True)[:20]
-    
-    # 转换记录类型计数器为字典
-    stats['record_types'] = dict(stats['record_types'])
+    stats['recently_added'] = heapq.nlargest(20, stats['recently_added'], key=lambda x: x['timestamp'])
     
+    # record_types 保留为 Counter (dict 子类)，可直接序列化为 JSON
     return stats
 
 
@@ -286,8 +311,8 @@ def main():
     
     # 保存 JSON 数据
     if args.json:
-        with open(args.json, 'w', encoding='utf-8') as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
+        with open(args.json, 'wb') as f:
+            f.write(json_dumps(stats, indent=True))
         print(f"JSON 数据已保存至: {args.json}")
     
     return 0
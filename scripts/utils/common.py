@@ -11,7 +11,46 @@ import os
 import re
 import json
 import socket
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """
+    解析 JSON 数据，安装了 orjson 时使用 orjson
+    
+    Args:
+        data: JSON 字节串或字符串
+    
+    Returns:
+        解析结果
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(data: Any, indent: bool = False) -> bytes:
+    """
+    将数据序列化为 UTF-8 JSON 字节串，安装了 orjson 时使用 orjson
+    
+    Args:
+        data: 要序列化的数据
+        indent: 是否以 2 空格缩进输出 (默认输出紧凑格式)
+    
+    Returns:
+        JSON 字节串
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None)
+    if indent:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
 
 
 def load_json_file(file_path: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
@@ -25,8 +64,16 @@ def load_json_file(file_path: str) -> Tuple[Optional[Dict[str, Any]], Optional[s
         (内容, 错误信息)
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f), None
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        
+        # 优先使用 orjson 直接解析字节；解析失败时交给标准库 json 重新解析，以生成详细的错误信息
+        if ORJSON_AVAILABLE:
+            try:
+                return orjson.loads(raw), None
+            except orjson.JSONDecodeError:
+                pass
+        return json.loads(raw.decode('utf-8')), None
     except json.JSONDecodeError as e:
         # 提供更详细的JSON格式错误信息
         error_msg = f"JSON 格式错误: {str(e)}"